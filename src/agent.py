@@ -1,22 +1,69 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import re
+import sqlite3
 import time
+from collections.abc import AsyncIterator, Coroutine
+from contextlib import closing
 from dataclasses import dataclass, field
-from typing import Optional
-from dotenv import load_dotenv
-import os
-import json
-import asyncio
+from datetime import date
+from decimal import Decimal, InvalidOperation
 
-from livekit import rtc, api
-from livekit.agents import (Agent, AgentSession, JobContext, RoomInputOptions, RunContext, WorkerOptions, cli, get_job_context, function_tool)
+from dotenv import load_dotenv
+from livekit import api, rtc
+from livekit.agents import (
+    Agent,
+    AgentSession,
+    ChatContext,
+    JobContext,
+    JobProcess,
+    RoomInputOptions,
+    RunContext,
+    WorkerOptions,
+    cli,
+    function_tool,
+    get_job_context,
+)
+from livekit.agents.voice import SpeechHandle
 from livekit.plugins import cartesia, deepgram, google, noise_cancellation, silero
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+else:
+    # Set at import time so job subprocesses, which re-import this module,
+    # also run on uvloop.
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+try:
+    import orjson
+except ImportError:
+    _json_loads = json.loads
+else:
+    _json_loads = orjson.loads
+
+# Records are handed to a background thread so stderr writes never block the
+# event loop.
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logging.root.setLevel(logging.INFO)
+logging.root.addHandler(logging.handlers.QueueHandler(_log_queue))
 logger = logging.getLogger("emily-agent")
 
-load_dotenv(".env.local")
-
 REQUIRED_ENV_VARS = [
     "LIVEKIT_API_KEY",
     "LIVEKIT_API_SECRET", 
@@ -24,282 +71,726 @@ REQUIRED_ENV_VARS = [
     "SIP_OUTBOUND_TRUNK_ID"
 ]
 
-def validate_environment():
-    missing_vars = []
-    for var in REQUIRED_ENV_VARS:
-        if not os.getenv(var):
-            missing_vars.append(var)
-    
-    if missing_vars:
-        raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
-    logger.info("All required environment variables validated successfully")
+# Exported once .env.local has been loaded. Job subprocesses inherit it along
+# with the loaded variables and skip parsing the file again, unless
+# CONFIG_RELOAD=1 is set.
+_DOTENV_LOADED_VAR = "EMILY_DOTENV_LOADED"
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    sip_trunk_id: str
+    llm_model: str
+    llm_max_output_tokens: int
+    closing_llm_max_output_tokens: int
+    stt_model: str
+    stt_language: str
+    stt_endpointing_ms: int
+    tts_model: str
+    tts_voice: str
+    call_state_db: str
+    call_state_ttl_s: float
+    tts_cache_dir: str
+
+    @classmethod
+    def from_env(cls, dotenv_path: str = ".env.local") -> "Config":
+        if os.getenv("CONFIG_RELOAD") == "1" or not os.getenv(_DOTENV_LOADED_VAR):
+            # load_dotenv rather than dotenv_values: the STT/TTS/LLM plugins
+            # read their API keys straight from os.environ.
+            load_dotenv(dotenv_path)
+            os.environ[_DOTENV_LOADED_VAR] = "1"
+
+        missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
+        if missing_vars:
+            raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.info("All required environment variables validated successfully")
+
+        return cls(
+            sip_trunk_id=os.environ["SIP_OUTBOUND_TRUNK_ID"],
+            llm_model=os.getenv("LLM_MODEL", "gemini-1.5-flash"),
+            llm_max_output_tokens=int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "128")),
+            closing_llm_max_output_tokens=int(os.getenv("CLOSING_LLM_MAX_OUTPUT_TOKENS", "256")),
+            stt_model=os.getenv("STT_MODEL", "nova-3"),
+            stt_language=os.getenv("STT_LANGUAGE", "en-US"),
+            stt_endpointing_ms=int(os.getenv("STT_ENDPOINTING_MS", "25")),
+            tts_model=os.getenv("TTS_MODEL", "sonic-english"),
+            tts_voice=os.getenv("TTS_VOICE", "6f84f4b8-58a2-430c-8c79-688dad597532"),
+            call_state_db=os.getenv("CALL_STATE_DB", "calls.sqlite3"),
+            call_state_ttl_s=float(os.getenv("CALL_STATE_TTL_HOURS", "24")) * 3600,
+            tts_cache_dir=os.getenv("TTS_CACHE_DIR", ".tts-cache"),
+        )
 
-validate_environment()
-outbound_trunk_id = os.getenv("SIP_OUTBOUND_TRUNK_ID")
+CONFIG = Config.from_env()
 
-def validate_phone_number(phone: str) -> bool:
-    pattern = r'^\+[1-9]\d{1,14}$'
-    return bool(re.match(pattern, phone))
+_CARD_RE = re.compile(r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b', re.ASCII)
+_SSN_RE = re.compile(r'\b\d{3}-\d{2}-\d{4}\b', re.ASCII)
+# Fewest digits either pattern can match; shorter lines skip the regexes.
+_SANITIZE_MIN_DIGITS = 9
 
-def validate_payment_amount(amount: str) -> bool:
+_SANITIZE = [
+    (_CARD_RE, '****-****-****-****'),
+    (_SSN_RE, '***-**-****'),
+]
+
+def _is_ascii_digits(value: str, length: int) -> bool:
+    return len(value) == length and value.isascii() and value.isdigit()
+
+def validate_phone_number(phone: str) -> bool:
+    # E.164: "+", a non-zero country code digit, then up to 14 more digits.
+    digits = phone[1:]
+    return (
+        3 <= len(phone) <= 16
+        and phone[0] == '+'
+        and digits[0] != '0'
+        and digits.isascii()
+        and digits.isdigit()
+    )
+
+_AMOUNT_STRIP = str.maketrans({'$': None, ',': None})
+_CENT = Decimal("0.01")
+
+# Customers often restate the same amount across turns; Decimal is immutable,
+# so cached results are safe to share.
+@functools.lru_cache(maxsize=256)
+def parse_payment_amount(amount: str) -> Decimal | None:
     try:
-        float_amount = float(amount.replace('$', '').replace(',', ''))
-        return 0 < float_amount <= 50000
-    except (ValueError, AttributeError):
-        return False
+        value = Decimal(amount.translate(_AMOUNT_STRIP))
+    except (InvalidOperation, AttributeError):
+        return None
+    # The range is checked first so quantize never overflows. Sub-cent input
+    # is rejected rather than rounded, so the customer is asked to restate it
+    # instead of being charged a different amount.
+    if not value.is_finite() or not 0 < value <= 50000:
+        return None
+    cents = value.quantize(_CENT)
+    if cents != value:
+        return None
+    return cents
+
+def format_amount(amount: Decimal) -> str:
+    return f"${amount:,.2f}"
+
+def _parse_iso_date(value: str) -> date | None:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_due_date(value: str) -> date | str | None:
+    # ISO dates become date objects; anything else the customer said ("the
+    # 15th", "next Friday") is kept as spoken rather than dropped.
+    value = value.strip()
+    if not value:
+        return None
+    return _parse_iso_date(value) or value
+
+def new_confirmation_number() -> str:
+    # SC[YYYYMMDD][####], the suffix taken from the millisecond clock. Each call
+    # runs in its own job process, so an in-process counter would restart at
+    # 0001 on every call.
+    now_ns = time.time_ns()
+    day = time.strftime('%Y%m%d', time.localtime(now_ns // 1_000_000_000))
+    return f"SC{day}{now_ns // 1_000_000 % 10_000:04d}"
 
 def sanitize_log_data(data: str) -> str:
-    patterns = [
-        (r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b', '****-****-****-****'),
-        (r'\b\d{3}-\d{2}-\d{4}\b', '***-**-****'),
-    ]
-    
-    for pattern, replacement in patterns:
-        data = re.sub(pattern, replacement, data)
+    if sum(map(data.count, "0123456789")) < _SANITIZE_MIN_DIGITS:
+        return data
+    for pattern, replacement in _SANITIZE:
+        data = pattern.sub(replacement, data)
     return data
 
+class _Sanitized:
+    # Log argument that masks its value only when the record is formatted, so
+    # filtered-out log calls never pay for the regex passes.
+    __slots__ = ("data",)
+
+    def __init__(self, data: str):
+        self.data = data
+
+    def __str__(self) -> str:
+        return sanitize_log_data(self.data)
+
+def _retry_delay(attempt: int, base: float) -> float:
+    # Exponential backoff with up to one base interval of jitter.
+    return base * (2 ** attempt) + random.random() * base
+
 async def hangup_call_with_retry(max_retries: int = 3):
+    # This runs as a background task, so a failure here has to be logged
+    # explicitly or it would surface only as an unretrieved task exception.
+    try:
+        job_ctx = get_job_context()
+        request = api.DeleteRoomRequest(room=job_ctx.room.name)
+    except Exception as e:
+        logger.error("Failed to prepare call hangup: %s", e)
+        return
     for attempt in range(max_retries):
         try:
-            logger.info(f"Hanging up the call (attempt {attempt + 1})")
-            job_ctx = get_job_context()
-            await job_ctx.api.room.delete_room(
-                api.DeleteRoomRequest(room=job_ctx.room.name)
-            )
+            logger.info("Hanging up the call (attempt %s)", attempt + 1)
+            await job_ctx.api.room.delete_room(request)
             logger.info("Call hung up successfully")
             return
         except Exception as e:
-            logger.error(f"Error hanging up call (attempt {attempt + 1}): {e}")
+            logger.error("Error hanging up call (attempt %s): %s", attempt + 1, e)
             if attempt < max_retries - 1:
-                await asyncio.sleep(2 ** attempt)
+                # DeleteRoom failures are usually transient, so retry quickly.
+                await asyncio.sleep(_retry_delay(attempt, 0.1))
             else:
                 logger.error("Failed to hang up call after all retries")
 
-@dataclass
+# Pause between the end of the goodbye playout and the hangup, so the last
+# audio frames reach the caller before the room is deleted.
+_HANGUP_GRACE_S = 0.5
+
+_pending_tasks: set[asyncio.Task] = set()
+
+def _run_in_background(coro: Coroutine) -> None:
+    task = asyncio.create_task(coro)
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+def hangup_call() -> None:
+    # Fire-and-forget: the caller has already waited for playout, so the
+    # DeleteRoom round-trip can overlap with the rest of the teardown.
+    _run_in_background(hangup_call_with_retry())
+
+# Turns carried into the next agent on a handoff. Older turns are dropped;
+# the per-call facts they established travel in the call-state note instead.
+_HANDOFF_MAX_ITEMS = 20
+
+async def _handoff(agent: Agent, next_agent_cls: type[Agent]) -> Agent:
+    # Each agent class is instantiated at most once per call and rebound to the
+    # current history on every later handoff. The history is a bounded copy:
+    # the last _HANDOFF_MAX_ITEMS turns plus a fresh call-state note, so each
+    # LLM request stays the same size however long the call runs.
+    chat_ctx = _with_call_state_context(
+        agent.chat_ctx,
+        agent.session.userdata,
+        max_items=_HANDOFF_MAX_ITEMS,
+        # The next agent inserts its own instructions; the old agent's
+        # must not travel with the history.
+        exclude_instructions=True,
+    )
+    agents = agent.session.userdata.agents
+    next_agent = agents.get(next_agent_cls)
+    if next_agent is None:
+        next_agent = agents[next_agent_cls] = next_agent_cls(chat_ctx=chat_ctx)
+    else:
+        await next_agent.update_chat_ctx(chat_ctx)
+    return next_agent
+
+@dataclass(slots=True)
 class CallState:
-    customer_name: Optional[str] = None
-    phone_number: Optional[str] = None
+    customer_name: str | None = None
+    phone_number: str | None = None
     is_interested: bool = False
-    payment_amount: Optional[str] = None
-    payment_method: Optional[str] = None
-    last_four_digits: Optional[str] = None
-    billing_zip: Optional[str] = None
-    due_date: Optional[str] = None
-    current_balance: Optional[str] = None
-    objections: list[str] = field(default_factory=list)
+    payment_amount: Decimal | None = None
+    payment_method: str | None = None
+    last_four_digits: int | None = None
+    billing_zip: str | None = None
+    due_date: date | str | None = None
+    current_balance: str | None = None
+    objections: tuple[str, ...] = ()
     has_overdue_balance: bool = False
     call_start_time: float = field(default_factory=time.time)
     interaction_count: int = 0
     payment_confirmed: bool = False
-    confirmation_number: Optional[str] = None
+    confirmation_number: str | None = None
+    last_confirmation_number: str | None = None
+    agents: dict[type[Agent], Agent] = field(default_factory=dict, repr=False, compare=False)
+
+# Fields carried over to the next call with the same number. Card verification
+# details and per-call outcome are deliberately left out.
+_RESUMABLE_FIELDS = (
+    "customer_name",
+    "payment_amount",
+    "payment_method",
+    "due_date",
+    "current_balance",
+    "objections",
+    "has_overdue_balance",
+    # History only: a bill recurs, so an earlier payment must not mark the
+    # next one as done.
+    "last_confirmation_number",
+)
+
+# Details of the bill being paid, saved empty once a payment goes through so
+# the next bill starts fresh.
+_CLEARED_AFTER_PAYMENT = {"payment_amount": None, "due_date": None, "objections": ()}
+
+# Most recent objections kept in the call state and carried between calls.
+_MAX_OBJECTIONS = 5
+
+def _recent_objections(objections) -> tuple[str, ...]:
+    return tuple(objections)[-_MAX_OBJECTIONS:]
+
+# Decoders for resumable fields that are not plain JSON types.
+_FIELD_DECODERS = {
+    "payment_amount": parse_payment_amount,
+    "due_date": parse_due_date,
+    "objections": _recent_objections,
+}
+
+def _open_call_state_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(CONFIG.call_state_db)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS call_state ("
+        "phone TEXT PRIMARY KEY, state_json TEXT NOT NULL, updated_at REAL NOT NULL)"
+    )
+    return conn
+
+def _load_call_state(phone_number: str) -> CallState:
+    with closing(_open_call_state_db()) as conn, conn:
+        # Saved state holds customer PII, so expired rows are deleted rather
+        # than just skipped.
+        conn.execute("DELETE FROM call_state WHERE updated_at < ?", (time.time() - CONFIG.call_state_ttl_s,))
+        row = conn.execute("SELECT state_json FROM call_state WHERE phone = ?", (phone_number,)).fetchone()
+
+    state = CallState(phone_number=phone_number)
+    if row:
+        for name, value in json.loads(row[0]).items():
+            if name in _RESUMABLE_FIELDS:
+                if value is not None and name in _FIELD_DECODERS:
+                    value = _FIELD_DECODERS[name](value)
+                setattr(state, name, value)
+    return state
+
+def _save_call_state(state: CallState) -> None:
+    values = {name: getattr(state, name) for name in _RESUMABLE_FIELDS}
+    if state.payment_confirmed:
+        values.update(_CLEARED_AFTER_PAYMENT)
+        values["last_confirmation_number"] = state.confirmation_number
+    state_json = json.dumps(values, default=str)
+    with closing(_open_call_state_db()) as conn, conn:
+        conn.execute(
+            "INSERT INTO call_state (phone, state_json, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(phone) DO UPDATE SET state_json = excluded.state_json, updated_at = excluded.updated_at",
+            (state.phone_number, state_json, time.time()),
+        )
 
-class GreetingAgent(Agent):
-    def __init__(self):
-        super().__init__(
-            instructions="""You are Emily, a professional payment specialist with SecureCard Financial Services.
-            Your current task is to start the call about credit card bill payment.
-            
-            IMPORTANT GUIDELINES:
-            1. Greet the customer professionally and warmly
-            2. Introduce yourself clearly: "This is Emily with SecureCard Financial Services"
-            3. Ask for confirmation of their name politely
-            4. Check if it's a good time to discuss their credit card account
-            5. Explain the purpose: "I'm calling to help you with convenient payment options for your credit card bill"
-            6. Listen carefully for verbal cues that indicate an answering machine
-            7. If you detect hesitation or disinterest, be respectful and offer to call back
-            
-            Keep your tone professional, friendly, and respectful. Speak clearly and at a moderate pace.
-            
-            Example opening: "Hello, this is Emily calling from SecureCard Financial Services. May I please speak with [Customer Name]? I'm calling today to help you with convenient payment options for your credit card account. Is this a good time to chat for just a few minutes?"
-            """
+async def load_call_state(phone_number: str) -> CallState:
+    try:
+        state = await asyncio.to_thread(_load_call_state, phone_number)
+    except (sqlite3.Error, ValueError) as e:
+        logger.error("Failed to load saved call state: %s", e)
+        return CallState(phone_number=phone_number)
+
+    if state.customer_name:
+        logger.info("Resuming saved call state for returning customer")
+    return state
+
+async def save_call_state(state: CallState) -> None:
+    try:
+        await asyncio.to_thread(_save_call_state, state)
+        logger.info("Call state saved")
+    except (sqlite3.Error, TypeError) as e:
+        logger.error("Failed to save call state: %s", e)
+
+_CALL_STATE_HEADER = "Call context (reference notes, not spoken by the customer):\n"
+
+def _call_state_summary(state: CallState) -> str | None:
+    facts = []
+    if state.customer_name:
+        facts.append(f"Customer name: {state.customer_name}")
+    if state.current_balance:
+        facts.append(f"Current balance: {state.current_balance}")
+    if state.payment_amount is not None:
+        label = "Payment amount paid" if state.payment_confirmed else "Payment amount discussed"
+        facts.append(f"{label}: {format_amount(state.payment_amount)}")
+    if state.due_date is not None:
+        facts.append(f"Payment due date: {state.due_date}")
+    if state.payment_method:
+        facts.append(f"Preferred payment method: {state.payment_method}")
+    if state.objections:
+        facts.append(f"Concerns raised so far: {'; '.join(state.objections)}")
+    if state.payment_confirmed and state.confirmation_number:
+        facts.append(f"Payment completed, confirmation number: {state.confirmation_number}")
+    elif state.last_confirmation_number:
+        facts.append(f"Previous payment confirmation number: {state.last_confirmation_number}")
+
+    if not facts:
+        return None
+    return _CALL_STATE_HEADER + "\n".join(f"- {fact}" for fact in facts)
+
+def _is_call_state_note(item) -> bool:
+    return item.type == "message" and (item.text_content or "").startswith(_CALL_STATE_HEADER)
+
+# Id livekit-agents gives the agent's instructions message in its chat_ctx.
+_INSTRUCTIONS_MESSAGE_ID = "lk.agent_task.instructions"
+
+def _with_call_state_context(
+    chat_ctx: ChatContext,
+    state: CallState,
+    max_items: int | None = None,
+    exclude_instructions: bool = False,
+) -> ChatContext:
+    # Per-call facts go into the history rather than the instructions, so each
+    # agent's system prompt stays byte-identical across calls and remains
+    # eligible for the provider's prompt-prefix cache. Earlier notes are
+    # replaced rather than stacked.
+    chat_ctx = chat_ctx.copy()
+    chat_ctx.items[:] = [
+        item
+        for item in chat_ctx.items
+        if not _is_call_state_note(item)
+        and not (exclude_instructions and item.id == _INSTRUCTIONS_MESSAGE_ID)
+    ]
+    # truncate() re-inserts the first system message, which on a short history
+    # would duplicate it, so only trim histories that are actually too long.
+    if max_items is not None and len(chat_ctx.items) > max_items:
+        chat_ctx.truncate(max_items=max_items)
+    summary = _call_state_summary(state)
+    if summary is not None:
+        chat_ctx.add_message(role="user", content=summary)
+    return chat_ctx
+
+async def _add_call_state_context(agent: Agent, state: CallState) -> None:
+    await agent.update_chat_ctx(_with_call_state_context(agent.chat_ctx, state))
+
+_VOICEMAIL_SCRIPT = (
+    "Hello, this is Emily from SecureCard Financial Services. I'm calling about convenient payment options "
+    "for your credit card account. Please call us back at 1-800-555-0123 at your convenience to discuss easy "
+    "payment solutions that can help you avoid late fees. Thank you and have a great day!"
+)
+
+# Fixed phrases whose synthesized audio is cached on disk and replayed
+# without a TTS round-trip once the cache is warm.
+_CANNED_PHRASES = (_VOICEMAIL_SCRIPT,)
+
+def _tts_cache_path(text: str, sample_rate: int, num_channels: int) -> str:
+    key = f"{CONFIG.tts_model}|{CONFIG.tts_voice}|{sample_rate}|{num_channels}|{text}"
+    return os.path.join(CONFIG.tts_cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".pcm")
+
+def _read_cached_audio(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write_cached_audio(path: str, pcm: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pcm)
+    os.replace(tmp_path, path)
+
+def load_canned_audio(tts) -> dict[str, bytes]:
+    canned_audio = {}
+    for text in _CANNED_PHRASES:
+        pcm = _read_cached_audio(_tts_cache_path(text, tts.sample_rate, tts.num_channels))
+        if pcm is not None:
+            canned_audio[text] = pcm
+    return canned_audio
+
+async def _synthesize_and_cache(tts, text: str, canned_audio: dict[str, bytes]) -> AsyncIterator[rtc.AudioFrame]:
+    # Plays the live synthesis and keeps its audio, so a cache miss costs one
+    # TTS request rather than a second one just to fill the cache. Playout
+    # that stops early (an interruption) leaves the cache untouched.
+    pcm = bytearray()
+    async with tts.synthesize(text) as stream:
+        async for audio in stream:
+            pcm += audio.frame.data.tobytes()
+            yield audio.frame
+
+    canned_audio[text] = pcm = bytes(pcm)
+    try:
+        path = _tts_cache_path(text, tts.sample_rate, tts.num_channels)
+        await asyncio.to_thread(_write_cached_audio, path, pcm)
+        logger.info("Cached TTS audio for canned phrase (%d bytes)", len(pcm))
+    except OSError as e:
+        logger.error("Failed to cache TTS audio: %s", e)
+
+async def _pcm_frames(pcm: bytes, sample_rate: int, num_channels: int) -> AsyncIterator[rtc.AudioFrame]:
+    samples_per_frame = sample_rate // 10
+    frame_size = samples_per_frame * num_channels * 2
+    for offset in range(0, len(pcm), frame_size):
+        chunk = pcm[offset:offset + frame_size]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            samples_per_channel=len(chunk) // (num_channels * 2),
         )
+
+def say_canned(session: AgentSession, text: str, **kwargs) -> SpeechHandle:
+    tts = session.tts
+    canned_audio = get_job_context().proc.userdata["canned_audio"]
+    pcm = canned_audio.get(text)
+    if pcm is None:
+        audio = _synthesize_and_cache(tts, text, canned_audio)
+    else:
+        audio = _pcm_frames(pcm, tts.sample_rate, tts.num_channels)
+    return session.say(text, audio=audio, **kwargs)
+
+_GREETING_INSTRUCTIONS = """You are Emily, a professional payment specialist with SecureCard Financial Services.
+Your current task is to start the call about credit card bill payment.
+
+IMPORTANT GUIDELINES:
+1. Greet the customer professionally and warmly
+2. Introduce yourself clearly: "This is Emily with SecureCard Financial Services"
+3. Ask for confirmation of their name politely
+4. Check if it's a good time to discuss their credit card account
+5. Explain the purpose: "I'm calling to help you with convenient payment options for your credit card bill"
+6. Listen carefully for verbal cues that indicate an answering machine
+7. If you detect hesitation or disinterest, be respectful and offer to call back
+
+Keep your tone professional, friendly, and respectful. Speak clearly and at a moderate pace.
+
+Example opening: "Hello, this is Emily calling from SecureCard Financial Services. May I please speak with [Customer Name]? I'm calling today to help you with convenient payment options for your credit card account. Is this a good time to chat for just a few minutes?"
+"""
+
+_GREETING_ON_ENTER_INSTRUCTIONS = "Greet the customer professionally, introduce yourself as Emily from SecureCard Financial Services, and explain you're calling about payment options for their credit card account."
+
+_PAYMENT_INQUIRY_INSTRUCTIONS = """You are Emily, a payment specialist. Your task is to understand their payment needs and situation.
+
+Key questions to ask (naturally, not as a rigid script):
+1. "Are you looking to make a payment on your current balance today?"
+2. "Do you have your credit card statement handy, or would you like me to help you with your current balance?"
+3. "When is your next payment due date?"
+4. "What payment amount were you thinking of making?"
+5. "Are you interested in learning about automatic payments to help avoid late fees in the future?"
+
+IMPORTANT:
+- Listen carefully to their responses
+- Be empathetic if they mention financial difficulties
+- Offer solutions that match their needs
+- Don't be pushy - focus on being helpful
+- If they seem confused about their balance, offer to help clarify
+
+Your goal is to understand their situation and guide them toward a payment solution that works for them."""
+
+_QUESTION_HANDLER_INSTRUCTIONS = """You are Emily, a knowledgeable payment specialist. Answer customer questions helpfully and accurately.
+
+Common questions and professional responses:
+- Balance inquiry: "I can help you check your current balance. For security, I'll need to verify the last four digits of your card and your billing ZIP code."
+- Payment methods: "We accept several convenient options: bank transfers, debit cards, and secure online payments. Which would work best for you?"
+- Due dates: "Let me help you understand your payment schedule and share some tips to avoid late fees."
+- Late fees: "I understand your concern about late fees. Let me explain how we can help prevent them in the future."
+- Auto-pay: "Automatic payments are a great way to ensure you never miss a due date. Would you like me to explain how our auto-pay service works?"
+- Minimum payment: "I can help you understand your minimum payment options and what works best for your situation."
+
+After answering their question thoroughly:
+- Ask if they have any other questions
+- Naturally guide back to helping with a payment
+- Be patient and thorough - good customer service builds trust"""
+
+_OBJECTION_HANDLER_INSTRUCTIONS = """You are Emily, an empathetic payment specialist. Handle objections with understanding and offer practical solutions.
+
+Professional responses to common objections:
+- "Don't have money right now": "I completely understand financial situations can be tight. Would you be interested in discussing a payment plan or making a smaller payment today to help with your account standing?"
+- "Not sure about balance": "That's perfectly fine. Let me help verify your current balance and payment options so you have all the information you need."
+- "Prefer to pay online": "That's absolutely fine! Many customers prefer online payments. Would you like me to walk you through our secure online portal, or would you prefer I send you the link?"
+- "Already made payment": "Thank you for letting me know. Let me help verify that your payment was processed correctly and update your account."
+- "Don't trust phone payments": "I completely understand that concern. Security is very important. Let me explain our security measures, or I can help you with other secure payment options."
+- "Too busy right now": "I understand you're busy. Would you prefer if I called back at a better time, or would you like me to quickly share some convenient payment options?"
+
+Always:
+- Acknowledge their concern first
+- Show empathy and understanding
+- Offer practical alternatives
+- Don't argue or pressure
+- Focus on solving their problem"""
+
+_PAYMENT_PROCESSING_INSTRUCTIONS = """You are Emily, a payment specialist handling secure payment processing.
+
+Security verification process:
+1. "For your security, I need to verify a few details before processing your payment."
+2. "Can you please provide the last four digits of your credit card?"
+3. "And can you confirm your billing ZIP code?"
+4. "Perfect! Now let me confirm the payment amount: $[amount]. Is that correct?"
+5. "Which payment method would you prefer: bank transfer, debit card, or online payment?"
+
+Payment processing steps:
+- Verify all security information
+- Confirm payment amount and method
+- Generate confirmation number (format: SC[YYYYMMDD][####])
+- Provide confirmation details
+- Explain when payment will post
+
+Always emphasize:
+- Security and protection of their information
+- Confirmation details they should keep
+- When the payment will appear on their account
+- How to contact us if they have questions
+
+Example: "Your payment of $150.00 has been processed successfully. Your confirmation number is SC20240115001. Please keep this number for your records. The payment will post to your account within 1-2 business days."""
+
+_GOODBYE_INSTRUCTIONS = """You are Emily. Your task is to end the call professionally based on what happened during the call.
+
+If a payment was successfully completed:
+- Thank them for the payment
+- Remind them of their confirmation number
+- Tell them when the payment will post
+- Provide customer service number for questions
+Example: "Thank you for your payment of $150 today. Your confirmation number is SC20240115001 - please keep this for your records. The payment will post to your account in 1-2 business days. If you have any questions, you can reach us at 1-800-555-0123. Have a wonderful day!"
+
+If no payment was made:
+- Thank them for their time
+- Remind them of payment options and due dates if discussed
+- Provide helpful contact information
+- Leave the door open for future contact
+Example: "Thank you for taking the time to speak with me today. Remember, you can make payments online 24/7 at our secure portal, or call us back anytime at 1-800-555-0123. We're here to help make payments convenient for you. Have a great day!"
+
+Always end on a positive, helpful note that reinforces good customer service."""
+
+
+_GOODBYE_ON_ENTER_INSTRUCTIONS = "Provide a professional goodbye based on the outcome of the call. If a payment was made, reference the confirmation number and next steps. If no payment was made, thank them and provide helpful contact information."
+
+
+def tracked_tool(fn):
+    # Registers fn as a function tool and counts every dispatch towards the
+    # call's interaction total.
+    @function_tool()
+    @functools.wraps(fn)
+    async def wrapper(self, context: RunContext[CallState], *args, **kwargs):
+        context.userdata.interaction_count += 1
+        return await fn(self, context, *args, **kwargs)
+    return wrapper
+
+
+class EndCallMixin:
+    END_CALL_LOG_MESSAGE = "Customer requested to end call."
+    END_CALL_REPLY = "Thank you for your time."
+
+    @tracked_tool
+    async def end_call(self, context: RunContext[CallState]):
+        logger.info(self.END_CALL_LOG_MESSAGE)
+        return self.END_CALL_REPLY, await _handoff(self, GoodbyeAgent)
+
+
+class GreetingAgent(EndCallMixin, Agent):
+    END_CALL_LOG_MESSAGE = "Customer requested to end call during greeting."
+    END_CALL_REPLY = "Of course, I understand. Thank you for your time."
+
+    def __init__(self):
+        super().__init__(instructions=_GREETING_INSTRUCTIONS)
     
     async def on_enter(self) -> None:
+        await _add_call_state_context(self, self.session.userdata)
         await self.session.generate_reply(
-            instructions="Greet the customer professionally, introduce yourself as Emily from SecureCard Financial Services, and explain you're calling about payment options for their credit card account."
+            instructions=_GREETING_ON_ENTER_INSTRUCTIONS
         )
 
-    @function_tool()
+    @tracked_tool
     async def detected_answering_machine(self, context: RunContext[CallState]):
         logger.info("Answering machine detected. Leaving message and hanging up.")
-        await context.session.generate_reply(
-            instructions="""Leave a brief, professional message: "Hello, this is Emily from SecureCard Financial Services. I'm calling about convenient payment options for your credit card account. Please call us back at 1-800-555-0123 at your convenience to discuss easy payment solutions that can help you avoid late fees. Thank you and have a great day!" After delivering this message completely, you will end the call."""
-        )
-        if context.session.current_speech:
-            await context.session.current_speech.wait_for_playout()
-        await hangup_call_with_retry()
-
-    @function_tool()
+        # The tool's own speech handle can't be awaited from inside the tool;
+        # wait on the step's playout and the new say() handle instead.
+        handle = say_canned(context.session, _VOICEMAIL_SCRIPT, allow_interruptions=False)
+        await context.wait_for_playout()
+        await handle
+        hangup_call()
+
+    @tracked_tool
     async def customer_confirmed_identity(self, context: RunContext[CallState], customer_name: str):
         context.userdata.customer_name = customer_name
-        context.userdata.interaction_count += 1
-        logger.info(f"Customer identity confirmed: {sanitize_log_data(customer_name)}")
+        logger.info("Customer identity confirmed: %s", _Sanitized(customer_name))
 
-    @function_tool()
+    @tracked_tool
     async def proceed_to_payment_inquiry(self, context: RunContext[CallState]):
         logger.info("Transitioning from Greeting to Payment Inquiry")
-        context.userdata.interaction_count += 1
-        return "Wonderful! Let me help you with that.", PaymentInquiryAgent(chat_ctx=self.session._chat_ctx)
+        return "Wonderful! Let me help you with that.", await _handoff(self, PaymentInquiryAgent)
 
-    @function_tool()
+    @tracked_tool
     async def customer_requests_callback(self, context: RunContext[CallState], preferred_time: str = ""):
-        logger.info(f"Customer requested callback for: {preferred_time}")
-        await context.session.generate_reply(
+        logger.info("Customer requested callback for: %s", preferred_time)
+        handle = context.session.generate_reply(
             instructions=f"Acknowledge their request professionally: 'Absolutely! I'll make sure someone calls you back {preferred_time if preferred_time else 'at a more convenient time'}. Thank you for your time, and have a great day!'"
         )
-        if context.session.current_speech:
-            await context.session.current_speech.wait_for_playout()
-        await hangup_call_with_retry()
+        await context.wait_for_playout()
+        await handle
+        hangup_call()
 
-    @function_tool()
-    async def end_call(self, context: RunContext[CallState]):
-        logger.info("Customer requested to end call during greeting.")
-        return "Of course, I understand. Thank you for your time.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
 
+class PaymentInquiryAgent(EndCallMixin, Agent):
+    END_CALL_LOG_MESSAGE = "Customer requested to end call during payment inquiry."
+    END_CALL_REPLY = "No problem at all. Thank you for your time."
 
-class PaymentInquiryAgent(Agent):
-    def __init__(self, chat_ctx):
+    def __init__(self, chat_ctx: ChatContext | None = None):
         super().__init__(
-            instructions="""You are Emily, a payment specialist. Your task is to understand their payment needs and situation.
-            
-            Key questions to ask (naturally, not as a rigid script):
-            1. "Are you looking to make a payment on your current balance today?"
-            2. "Do you have your credit card statement handy, or would you like me to help you with your current balance?"
-            3. "When is your next payment due date?"
-            4. "What payment amount were you thinking of making?"
-            5. "Are you interested in learning about automatic payments to help avoid late fees in the future?"
-            
-            IMPORTANT:
-            - Listen carefully to their responses
-            - Be empathetic if they mention financial difficulties
-            - Offer solutions that match their needs
-            - Don't be pushy - focus on being helpful
-            - If they seem confused about their balance, offer to help clarify
-            
-            Your goal is to understand their situation and guide them toward a payment solution that works for them.""",
+            instructions=_PAYMENT_INQUIRY_INSTRUCTIONS,
             chat_ctx=chat_ctx,
         )
 
-    @function_tool()
+    @tracked_tool
     async def customer_wants_to_pay(self, context: RunContext[CallState], payment_amount: str, due_date: str = "", current_balance: str = ""):
-        if not validate_payment_amount(payment_amount):
-            logger.warning(f"Invalid payment amount provided: {payment_amount}")
+        amount = parse_payment_amount(payment_amount)
+        if amount is None:
+            logger.warning("Invalid payment amount provided: %s", payment_amount)
             await context.session.generate_reply(
                 instructions="The payment amount seems unclear. Could you please confirm the amount you'd like to pay? For example, '$150' or '$75.50'?"
             )
             return
         
-        logger.info(f"Customer wants to make payment. Amount: {payment_amount}")
+        logger.info("Customer wants to make payment. Amount: %s", amount)
         context.userdata.is_interested = True
-        context.userdata.payment_amount = payment_amount
-        context.userdata.due_date = due_date
+        context.userdata.payment_amount = amount
+        context.userdata.due_date = parse_due_date(due_date)
         context.userdata.current_balance = current_balance
-        context.userdata.interaction_count += 1
-        return "Perfect! Let me help you process that payment securely.", PaymentProcessingAgent(chat_ctx=self.session._chat_ctx)
+        return "Perfect! Let me help you process that payment securely.", await _handoff(self, PaymentProcessingAgent)
 
-    @function_tool()
+    @tracked_tool
     async def customer_has_question(self, context: RunContext[CallState], question_type: str):
-        logger.info(f"Customer has question: {sanitize_log_data(question_type)}")
-        context.userdata.interaction_count += 1
-        return "I'd be happy to help you with that.", QuestionHandlerAgent(chat_ctx=self.session._chat_ctx)
+        logger.info("Customer has question: %s", _Sanitized(question_type))
+        return "I'd be happy to help you with that.", await _handoff(self, QuestionHandlerAgent)
 
-    @function_tool()
+    @tracked_tool
     async def customer_not_interested(self, context: RunContext[CallState], reason: str = ""):
-        logger.info(f"Customer not interested. Reason: {sanitize_log_data(reason)}")
-        context.userdata.interaction_count += 1
-        return "I completely understand. Thank you for your time.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
+        logger.info("Customer not interested. Reason: %s", _Sanitized(reason))
+        return "I completely understand. Thank you for your time.", await _handoff(self, GoodbyeAgent)
     
-    @function_tool()
+    @tracked_tool
     async def customer_has_objection(self, context: RunContext[CallState], objection: str):
-        logger.info(f"Customer objection: {sanitize_log_data(objection)}")
-        context.userdata.objections.append(objection)
-        context.userdata.interaction_count += 1
-        return "I understand your concern. Let me help address that.", ObjectionHandlerAgent(chat_ctx=self.session._chat_ctx)
+        logger.info("Customer objection: %s", _Sanitized(objection))
+        context.userdata.objections = _recent_objections((*context.userdata.objections, objection))
+        return "I understand your concern. Let me help address that.", await _handoff(self, ObjectionHandlerAgent)
     
-    @function_tool()
+    @tracked_tool
     async def customer_needs_balance_info(self, context: RunContext[CallState]):
         logger.info("Customer needs balance information")
-        context.userdata.interaction_count += 1
-        return "Let me help you with your balance information.", QuestionHandlerAgent(chat_ctx=self.session._chat_ctx)
-    
-    @function_tool()
-    async def end_call(self, context: RunContext[CallState]):
-        logger.info("Customer requested to end call during payment inquiry.")
-        return "No problem at all. Thank you for your time.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
+        return "Let me help you with your balance information.", await _handoff(self, QuestionHandlerAgent)
+
 
+class QuestionHandlerAgent(EndCallMixin, Agent):
+    END_CALL_LOG_MESSAGE = "Customer requested to end call after questions."
+    END_CALL_REPLY = "I'm glad I could help answer your questions. Thank you for calling."
 
-class QuestionHandlerAgent(Agent):
-    def __init__(self, chat_ctx):
+    def __init__(self, chat_ctx: ChatContext | None = None):
         super().__init__(
-            instructions="""You are Emily, a knowledgeable payment specialist. Answer customer questions helpfully and accurately.
-            
-            Common questions and professional responses:
-            - Balance inquiry: "I can help you check your current balance. For security, I'll need to verify the last four digits of your card and your billing ZIP code."
-            - Payment methods: "We accept several convenient options: bank transfers, debit cards, and secure online payments. Which would work best for you?"
-            - Due dates: "Let me help you understand your payment schedule and share some tips to avoid late fees."
-            - Late fees: "I understand your concern about late fees. Let me explain how we can help prevent them in the future."
-            - Auto-pay: "Automatic payments are a great way to ensure you never miss a due date. Would you like me to explain how our auto-pay service works?"
-            - Minimum payment: "I can help you understand your minimum payment options and what works best for your situation."
-            
-            After answering their question thoroughly:
-            - Ask if they have any other questions
-            - Naturally guide back to helping with a payment
-            - Be patient and thorough - good customer service builds trust""",
+            instructions=_QUESTION_HANDLER_INSTRUCTIONS,
             chat_ctx=chat_ctx,
         )
     
-    @function_tool()
+    @tracked_tool
     async def question_answered_proceed_to_payment(self, context: RunContext[CallState]):
         logger.info("Question answered, proceeding to payment inquiry.")
-        context.userdata.interaction_count += 1
-        return "I hope that helps! Now, would you like to take care of a payment today?", PaymentInquiryAgent(chat_ctx=self.session._chat_ctx)
+        return "I hope that helps! Now, would you like to take care of a payment today?", await _handoff(self, PaymentInquiryAgent)
     
-    @function_tool()
+    @tracked_tool
     async def customer_has_more_questions(self, context: RunContext[CallState]):
         logger.info("Customer has additional questions")
-        context.userdata.interaction_count += 1
         await context.session.generate_reply(
             instructions="Encourage them to ask: 'Of course! What other questions can I help you with?'"
         )
-    
-    @function_tool()
-    async def end_call(self, context: RunContext[CallState]):
-        logger.info("Customer requested to end call after questions.")
-        return "I'm glad I could help answer your questions. Thank you for calling.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
 
 
-class ObjectionHandlerAgent(Agent):
-    def __init__(self, chat_ctx):
+class ObjectionHandlerAgent(EndCallMixin, Agent):
+    END_CALL_LOG_MESSAGE = "Customer maintained objection and requested to end call."
+    END_CALL_REPLY = "I understand completely. Please don't hesitate to call us if you need any assistance in the future."
+
+    def __init__(self, chat_ctx: ChatContext | None = None):
         super().__init__(
-            instructions="""You are Emily, an empathetic payment specialist. Handle objections with understanding and offer practical solutions.
-            
-            Professional responses to common objections:
-            - "Don't have money right now": "I completely understand financial situations can be tight. Would you be interested in discussing a payment plan or making a smaller payment today to help with your account standing?"
-            - "Not sure about balance": "That's perfectly fine. Let me help verify your current balance and payment options so you have all the information you need."
-            - "Prefer to pay online": "That's absolutely fine! Many customers prefer online payments. Would you like me to walk you through our secure online portal, or would you prefer I send you the link?"
-            - "Already made payment": "Thank you for letting me know. Let me help verify that your payment was processed correctly and update your account."
-            - "Don't trust phone payments": "I completely understand that concern. Security is very important. Let me explain our security measures, or I can help you with other secure payment options."
-            - "Too busy right now": "I understand you're busy. Would you prefer if I called back at a better time, or would you like me to quickly share some convenient payment options?"
-            
-            Always:
-            - Acknowledge their concern first
-            - Show empathy and understanding  
-            - Offer practical alternatives
-            - Don't argue or pressure
-            - Focus on solving their problem""",
+            instructions=_OBJECTION_HANDLER_INSTRUCTIONS,
             chat_ctx=chat_ctx,
         )
     
-    @function_tool()
+    @tracked_tool
     async def objection_resolved(self, context: RunContext[CallState]):
         logger.info("Objection resolved, returning to payment inquiry.")
-        context.userdata.interaction_count += 1
-        return "I'm glad we could work that out. Now, how can I best help you with your payment today?", PaymentInquiryAgent(chat_ctx=self.session._chat_ctx)
+        return "I'm glad we could work that out. Now, how can I best help you with your payment today?", await _handoff(self, PaymentInquiryAgent)
     
-    @function_tool()
+    @tracked_tool
     async def offer_alternative_solution(self, context: RunContext[CallState], solution_type: str):
-        logger.info(f"Offering alternative solution: {solution_type}")
-        context.userdata.interaction_count += 1
+        logger.info("Offering alternative solution: %s", solution_type)
         
         solutions = {
             "online_payment": "I can send you a secure link to make your payment online at your convenience.",
@@ -308,178 +799,157 @@ class ObjectionHandlerAgent(Agent):
             "email_info": "I can email you all the payment information so you can handle it when convenient."
         }
         
-        return solutions.get(solution_type, "Let me see what other options I can offer you."), PaymentInquiryAgent(chat_ctx=self.session._chat_ctx)
-    
-    @function_tool()
-    async def end_call(self, context: RunContext[CallState]):
-        logger.info("Customer maintained objection and requested to end call.")
-        return "I understand completely. Please don't hesitate to call us if you need any assistance in the future.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
+        return solutions.get(solution_type, "Let me see what other options I can offer you."), await _handoff(self, PaymentInquiryAgent)
+
 
+class PaymentProcessingAgent(EndCallMixin, Agent):
+    END_CALL_LOG_MESSAGE = "Customer requested to end call during payment processing."
+    END_CALL_REPLY = "No problem. You can always call back to complete your payment when you're ready."
 
-class PaymentProcessingAgent(Agent):
-    def __init__(self, chat_ctx):
+    def __init__(self, chat_ctx: ChatContext | None = None):
         super().__init__(
-            instructions="""You are Emily, a payment specialist handling secure payment processing. 
-            
-            Security verification process:
-            1. "For your security, I need to verify a few details before processing your payment."
-            2. "Can you please provide the last four digits of your credit card?"
-            3. "And can you confirm your billing ZIP code?"
-            4. "Perfect! Now let me confirm the payment amount: $[amount]. Is that correct?"
-            5. "Which payment method would you prefer: bank transfer, debit card, or online payment?"
-            
-            Payment processing steps:
-            - Verify all security information
-            - Confirm payment amount and method
-            - Generate confirmation number (format: SC[YYYYMMDD][####])
-            - Provide confirmation details
-            - Explain when payment will post
-            
-            Always emphasize:
-            - Security and protection of their information
-            - Confirmation details they should keep
-            - When the payment will appear on their account
-            - How to contact us if they have questions
-            
-            Example: "Your payment of $150.00 has been processed successfully. Your confirmation number is SC20240115001. Please keep this number for your records. The payment will post to your account within 1-2 business days.""",
+            instructions=_PAYMENT_PROCESSING_INSTRUCTIONS,
             chat_ctx=chat_ctx,
         )
     
-    @function_tool()
+    @tracked_tool
     async def verify_customer_info(self, context: RunContext[CallState], last_four_digits: str, billing_zip: str):
-        if not re.match(r'^\d{4}$', last_four_digits):
+        if not _is_ascii_digits(last_four_digits, 4):
             await context.session.generate_reply(
                 instructions="I need exactly four digits. Could you please provide just the last four digits of your credit card?"
             )
             return
         
-        if not re.match(r'^\d{5}$', billing_zip):
+        if not _is_ascii_digits(billing_zip, 5):
             await context.session.generate_reply(
                 instructions="I need your 5-digit ZIP code. Could you please provide your billing ZIP code?"
             )
             return
         
-        context.userdata.last_four_digits = last_four_digits
+        context.userdata.last_four_digits = int(last_four_digits)
         context.userdata.billing_zip = billing_zip
-        context.userdata.interaction_count += 1
-        logger.info(f"Customer info verified: ****{last_four_digits}, ZIP: {billing_zip}")
+        logger.info("Customer info verified: ****%04d, ZIP: %s", context.userdata.last_four_digits, billing_zip)
     
-    @function_tool()
+    @tracked_tool
     async def process_payment(self, context: RunContext[CallState], payment_method: str):
-        if not context.userdata.last_four_digits or not context.userdata.billing_zip:
+        if context.userdata.last_four_digits is None or not context.userdata.billing_zip:
             await context.session.generate_reply(
                 instructions="I still need to verify your information before processing the payment. Could you provide the last four digits of your card and billing ZIP code?"
             )
             return
     
-        confirmation_number = f"SC{time.strftime('%Y%m%d')}{str(int(time.time()))[-4:]}"
+        confirmation_number = new_confirmation_number()
         context.userdata.payment_method = payment_method
         context.userdata.payment_confirmed = True
         context.userdata.confirmation_number = confirmation_number
-        context.userdata.interaction_count += 1
         
-        logger.info(f"Payment processed: {context.userdata.payment_amount} via {payment_method}, Confirmation: {confirmation_number}")
-        return f"Excellent! Your payment of {context.userdata.payment_amount} has been processed successfully via {payment_method}. Your confirmation number is {confirmation_number}.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
+        logger.info("Payment processed: %s via %s, Confirmation: %s", context.userdata.payment_amount, payment_method, confirmation_number)
+        return f"Excellent! Your payment of {format_amount(context.userdata.payment_amount)} has been processed successfully via {payment_method}. Your confirmation number is {confirmation_number}.", await _handoff(self, GoodbyeAgent)
     
-    @function_tool()
+    @tracked_tool
     async def payment_failed(self, context: RunContext[CallState], reason: str):
-        logger.warning(f"Payment failed: {sanitize_log_data(reason)}")
-        context.userdata.interaction_count += 1
-        return f"I apologize, but we're experiencing a technical issue with processing your payment. Let me help you with an alternative method.", ObjectionHandlerAgent(chat_ctx=self.session._chat_ctx)
+        logger.warning("Payment failed: %s", _Sanitized(reason))
+        return "I apologize, but we're experiencing a technical issue with processing your payment. Let me help you with an alternative method.", await _handoff(self, ObjectionHandlerAgent)
     
-    @function_tool()
+    @tracked_tool
     async def customer_wants_different_amount(self, context: RunContext[CallState], new_amount: str):
-        if not validate_payment_amount(new_amount):
+        amount = parse_payment_amount(new_amount)
+        if amount is None:
             await context.session.generate_reply(
                 instructions="Could you please clarify the payment amount? For example, '$150' or '$75.50'?"
             )
             return
         
-        context.userdata.payment_amount = new_amount
-        context.userdata.interaction_count += 1
-        logger.info(f"Payment amount changed to: {new_amount}")
+        context.userdata.payment_amount = amount
+        logger.info("Payment amount changed to: %s", amount)
         await context.session.generate_reply(
-            instructions=f"Got it! I've updated your payment amount to {new_amount}. Let me continue with the security verification."
+            instructions=f"Got it! I've updated your payment amount to {format_amount(amount)}. Let me continue with the security verification."
         )
-    
-    @function_tool()
-    async def end_call(self, context: RunContext[CallState]):
-        logger.info("Customer requested to end call during payment processing.")
-        return "No problem. You can always call back to complete your payment when you're ready.", GoodbyeAgent(chat_ctx=self.session._chat_ctx)
 
 
 class GoodbyeAgent(Agent):
-    def __init__(self, chat_ctx):
+    def __init__(self, chat_ctx: ChatContext | None = None):
         super().__init__(
-            instructions="""You are Emily. Your task is to end the call professionally based on what happened during the call.
-            
-            If a payment was successfully completed:
-            - Thank them for the payment
-            - Remind them of their confirmation number 
-            - Tell them when the payment will post
-            - Provide customer service number for questions
-            Example: "Thank you for your payment of $150 today. Your confirmation number is SC20240115001 - please keep this for your records. The payment will post to your account in 1-2 business days. If you have any questions, you can reach us at 1-800-555-0123. Have a wonderful day!"
-            
-            If no payment was made:
-            - Thank them for their time
-            - Remind them of payment options and due dates if discussed
-            - Provide helpful contact information
-            - Leave the door open for future contact
-            Example: "Thank you for taking the time to speak with me today. Remember, you can make payments online 24/7 at our secure portal, or call us back anytime at 1-800-555-0123. We're here to help make payments convenient for you. Have a great day!"
-            
-            Always end on a positive, helpful note that reinforces good customer service.""",
+            instructions=_GOODBYE_INSTRUCTIONS,
             chat_ctx=chat_ctx,
+            llm=get_job_context().proc.userdata["closing_llm"],
         )
 
     async def on_enter(self) -> None:
         await self.session.generate_reply(
-            instructions="Provide a professional goodbye based on the outcome of the call. If a payment was made, reference the confirmation number and next steps. If no payment was made, thank them and provide helpful contact information."
+            instructions=_GOODBYE_ON_ENTER_INSTRUCTIONS
         )
        
         if self.session.current_speech:
             await self.session.current_speech.wait_for_playout()
         
-        await asyncio.sleep(2)
-        await hangup_call_with_retry()
+        await asyncio.sleep(_HANGUP_GRACE_S)
+        hangup_call()
 
 
 async def create_sip_participant_with_retry(ctx: JobContext, phone_number: str, max_retries: int = 3):
     participant_identity = phone_number
+    request = api.CreateSIPParticipantRequest(
+        room_name=ctx.room.name,
+        sip_trunk_id=CONFIG.sip_trunk_id,
+        sip_call_to=phone_number,
+        participant_identity=participant_identity,
+        wait_until_answered=True,
+    )
     
     for attempt in range(max_retries):
         try:
-            logger.info(f"Dialing SIP participant: {phone_number} (attempt {attempt + 1})")
-            await ctx.api.sip.create_sip_participant(
-                api.CreateSIPParticipantRequest(
-                    room_name=ctx.room.name,
-                    sip_trunk_id=outbound_trunk_id,
-                    sip_call_to=phone_number,
-                    participant_identity=participant_identity,
-                    wait_until_answered=True,
-                )
-            )
+            logger.info("Dialing SIP participant: %s (attempt %s)", phone_number, attempt + 1)
+            await ctx.api.sip.create_sip_participant(request)
             logger.info("SIP participant answered successfully")
             return participant_identity
             
         except api.TwirpError as e:
-            logger.error(f"Error creating SIP participant (attempt {attempt + 1}): {e.message}")
-            logger.error(f"SIP status: {e.metadata.get('sip_status')}")
+            logger.error("Error creating SIP participant (attempt %s): %s", attempt + 1, e.message)
+            logger.error("SIP status: %s", e.metadata.get('sip_status'))
             
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                logger.info(f"Retrying in {wait_time} seconds...")
+                # Dial failures are mostly busy or unanswered lines, so keep a
+                # one-second base before redialing.
+                wait_time = _retry_delay(attempt, 1.0)
+                logger.info("Retrying in %.1f seconds...", wait_time)
                 await asyncio.sleep(wait_time)
             else:
                 logger.error("Failed to create SIP participant after all retries")
                 raise
 
 
+def prewarm(proc: JobProcess):
+    logger.info("Loading VAD model...")
+    proc.userdata["vad"] = silero.VAD.load()
+    logger.info("VAD model loaded successfully")
+
+    # Voice turns are short, so the session LLM is capped tightly; only the
+    # closing summary gets a larger budget.
+    proc.userdata["llm"] = google.LLM(model=CONFIG.llm_model, max_output_tokens=CONFIG.llm_max_output_tokens)
+    proc.userdata["closing_llm"] = google.LLM(model=CONFIG.llm_model, max_output_tokens=CONFIG.closing_llm_max_output_tokens)
+    # Streaming with interim results and no_delay so transcripts arrive while
+    # the customer is still speaking. These match the plugin's defaults and
+    # are pinned so an upgrade cannot change them silently. smart_format stays
+    # off: it adds formatting latency, and the LLM already turns spoken
+    # amounts into the numerals the payment tools expect.
+    proc.userdata["stt"] = deepgram.STT(
+        model=CONFIG.stt_model,
+        language=CONFIG.stt_language,
+        interim_results=True,
+        no_delay=True,
+        endpointing_ms=CONFIG.stt_endpointing_ms,
+    )
+    proc.userdata["tts"] = cartesia.TTS(model=CONFIG.tts_model, voice=CONFIG.tts_voice)
+    proc.userdata["canned_audio"] = load_canned_audio(proc.userdata["tts"])
+
+
 async def entrypoint(ctx: JobContext):
     try:
         try:
-            dial_info = json.loads(ctx.job.metadata or "{}")
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in job metadata: {ctx.job.metadata}, error: {e}")
+            dial_info = _json_loads(ctx.job.metadata) if ctx.job.metadata else {}
+        except ValueError as e:  # json and orjson decode errors both subclass it
+            logger.error("Invalid JSON in job metadata: %s, error: %s", ctx.job.metadata, e)
             return
 
         phone_number = dial_info.get("phone_number")
@@ -488,27 +958,22 @@ async def entrypoint(ctx: JobContext):
             return
 
         if not validate_phone_number(phone_number):
-            logger.error(f"Invalid phone number format: {phone_number}")
+            logger.error("Invalid phone number format: %s", phone_number)
             return
 
-        logger.info(f"Starting outbound payment call for room: {ctx.room.name}, dialing: {sanitize_log_data(phone_number)}")
+        logger.info("Starting outbound payment call for room: %s, dialing: %s", ctx.room.name, _Sanitized(phone_number))
 
+        call_state = await load_call_state(phone_number)
         await ctx.connect()
-        logger.info("Loading VAD model...")
-        try:
-            vad = silero.VAD.load()
-            logger.info("VAD model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load VAD model: {e}")
-            return
 
         session = AgentSession[CallState](
-            llm=google.LLM(model="gemini-1.5-flash"),
-            stt=deepgram.STT(model="nova-3", language="en-US"),
-            tts=cartesia.TTS(model="sonic-english", voice="6f84f4b8-58a2-430c-8c79-688dad597532"),
-            vad=vad,
-            userdata=CallState(phone_number=phone_number),
+            llm=ctx.proc.userdata["llm"],
+            stt=ctx.proc.userdata["stt"],
+            tts=ctx.proc.userdata["tts"],
+            vad=ctx.proc.userdata["vad"],
+            userdata=call_state,
         )
+        ctx.add_shutdown_callback(lambda: save_call_state(call_state))
 
         session_started = asyncio.create_task(
             session.start(
@@ -520,26 +985,38 @@ async def entrypoint(ctx: JobContext):
             )
         )
 
-        try:
-            participant_identity = await create_sip_participant_with_retry(ctx, phone_number)
-        except api.TwirpError:
+        # Dialing and waiting for the callee to join run alongside session start,
+        # so the greeting can begin as soon as both sides are ready.
+        async def _dial() -> rtc.RemoteParticipant:
+            try:
+                participant_identity = await create_sip_participant_with_retry(ctx, phone_number)
+            except api.TwirpError:
+                session_started.cancel()
+                raise
+            return await ctx.wait_for_participant(identity=participant_identity)
+
+        session_result, dial_result = await asyncio.gather(session_started, _dial(), return_exceptions=True)
+        if isinstance(dial_result, api.TwirpError):
             ctx.shutdown()
             return
+        for result in (dial_result, session_result):
+            if isinstance(result, BaseException):
+                raise result
 
-        await session_started
-        participant = await ctx.wait_for_participant(identity=participant_identity)
-        logger.info(f"Participant joined: {participant.identity}")
+        participant = dial_result
+        logger.info("Participant joined: %s", participant.identity)
         call_duration = time.time() - session.userdata.call_start_time
-        logger.info(f"Call completed. Duration: {call_duration:.1f}s, Interactions: {session.userdata.interaction_count}, Payment: {session.userdata.payment_confirmed}")
+        logger.info("Call completed. Duration: %.1fs, Interactions: %s, Payment: %s", call_duration, session.userdata.interaction_count, session.userdata.payment_confirmed)
 
     except Exception as e:
-        logger.error(f"Unexpected error in entrypoint: {e}")
+        logger.error("Unexpected error in entrypoint: %s", e)
         ctx.shutdown()
 
 
 if __name__ == "__main__":
     cli.run_app(WorkerOptions(
         entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
         agent_name="emily-payment-specialist",
         num_idle_processes=1,
         load_threshold=float('inf'),
@@ -1,12 +1,41 @@
+import argparse
 import asyncio
-import os
+import functools
 import json
-import time
+import logging
+import os
+import random
 import re
-from typing import Optional
+import sys
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
 from dotenv import load_dotenv
 from livekit import api
 
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+else:
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+logger = logging.getLogger("emily-call")
+
 AGENT_NAME = "emily-payment-specialist"
 PHONE_NUMBER_TO_CALL = "+919787264648"
 
@@ -17,82 +46,227 @@ REQUIRED_ENV_VARS = [
     "SIP_OUTBOUND_TRUNK_ID"
 ]
 
+# Local record of the rooms this script created, so cleanup can delete stale
+# ones by name instead of listing every room in the project.
+ROOM_LEDGER_PATH = os.path.expanduser(os.getenv("ROOM_LEDGER_PATH", "~/.securecard/rooms.json"))
+
+MONITOR_MIN_INTERVAL = 1.0
+MONITOR_MAX_INTERVAL = 30.0
+
+WEBHOOK_PATH = "/livekit/webhook"
+_ROOM_CHANGE_EVENTS = frozenset({"participant_joined", "participant_left", "room_finished"})
+
+# Never mutated, so every list_rooms call can send the same message
+_LIST_ROOMS_REQUEST = api.ListRoomsRequest()
+
+def _warm_api() -> None:
+    # Build and serialize one of each request the script sends, so protobuf's
+    # lazy descriptor and encoder setup happens at import, not on the first
+    # dispatch.
+    try:
+        for request in (
+            _LIST_ROOMS_REQUEST,
+            api.CreateAgentDispatchRequest(agent_name=AGENT_NAME, room="", metadata=""),
+            api.ListParticipantsRequest(room=""),
+            api.DeleteRoomRequest(room=""),
+        ):
+            request.SerializeToString()
+    except Exception as e:
+        logger.debug("API warm-up skipped: %s", e)
+
+_warm_api()
+
+_E164_RE = re.compile(r'^\+[1-9]\d{1,14}\Z', re.ASCII)
+_ROOM_TS_RE = re.compile(r'^payment-outbound-call-(\d+)\Z', re.ASCII)
+# Room-name timestamps below this are whole seconds (10 digits until 2286)
+_LEGACY_ROOM_TS_LIMIT = 10 ** 12
+
+_HTTP_SCHEMES = {"wss": "https", "ws": "http"}
+
+def http_url(ws_url: str) -> str:
+    """Map a LiveKit ws(s):// URL to the http(s):// URL the server API expects."""
+    parts = urlsplit(ws_url)
+    scheme = _HTTP_SCHEMES.get(parts.scheme.lower())
+    return urlunsplit(parts._replace(scheme=scheme)) if scheme else ws_url
+
 def validate_phone_number(phone: str) -> bool:
-    pattern = r'^\+[1-9]\d{1,14}$'
-    return bool(re.match(pattern, phone))
+    return _E164_RE.match(phone) is not None
 
-def validate_environment() -> dict:
+@functools.lru_cache(maxsize=1)
+def validate_environment() -> tuple[tuple[str, str], ...]:
+    """Load .env.local once per process and return the required variables as (name, value) pairs."""
     load_dotenv(".env.local")
-    env_vars = {}
+    env_vars = []
     missing_vars = []
     for var in REQUIRED_ENV_VARS:
         value = os.getenv(var)
         if not value:
             missing_vars.append(var)
         else:
-            env_vars[var] = value
+            env_vars.append((var, value))
     
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
     
-    return env_vars
+    return tuple(env_vars)
+
+@contextmanager
+def _room_ledger_lock() -> Iterator[None]:
+    """Hold an exclusive lock on the room ledger across processes and threads."""
+    os.makedirs(os.path.dirname(ROOM_LEDGER_PATH), exist_ok=True)
+    with open(ROOM_LEDGER_PATH + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_room_ledger() -> dict[str, int] | None:
+    """Return {room_name: created_ns}, or None if there is no usable ledger."""
+    try:
+        with open(ROOM_LEDGER_PATH, encoding="utf-8") as f:
+            return {name: int(created_ns) for name, created_ns in json.load(f).items()}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning("⚠️  Ignoring unreadable room ledger %s: %s", ROOM_LEDGER_PATH, e)
+        return None
+
+def _write_room_ledger(ledger: dict[str, int]) -> None:
+    tmp_path = f"{ROOM_LEDGER_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(ledger, f)
+    os.replace(tmp_path, ROOM_LEDGER_PATH)
+
+def record_room(room_name: str, created_ns: int) -> None:
+    with _room_ledger_lock():
+        ledger = _read_room_ledger() or {}
+        ledger[room_name] = created_ns
+        _write_room_ledger(ledger)
+
+def forget_rooms(room_names: Sequence[str]) -> None:
+    with _room_ledger_lock():
+        ledger = _read_room_ledger()
+        if ledger is None:
+            return
+        for room_name in room_names:
+            ledger.pop(room_name, None)
+        _write_room_ledger(ledger)
+
+class AsyncLiveKitPool:
+    """Share one LiveKitAPI client, and its HTTP connection pool, across calls.
 
-async def test_api_connection(env_vars: dict) -> api.LiveKitAPI:
+    The client is created on first acquire() and closed once it has sat unused
+    for max_idle seconds; the next acquire() transparently opens a new one.
+    """
+
+    def __init__(self, env_vars: dict, max_idle: float = 60.0):
+        self._url = http_url(env_vars["LIVEKIT_URL"])
+        self._api_key = env_vars["LIVEKIT_API_KEY"]
+        self._api_secret = env_vars["LIVEKIT_API_SECRET"]
+        self._max_idle = max_idle
+        self._client: api.LiveKitAPI | None = None
+        self._in_use = 0
+        self._idle_handle: asyncio.TimerHandle | None = None
+        self._closing: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "AsyncLiveKitPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[api.LiveKitAPI]:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._client is None:
+            self._client = api.LiveKitAPI(url=self._url, api_key=self._api_key, api_secret=self._api_secret)
+        self._in_use += 1
+        try:
+            yield self._client
+        finally:
+            self._in_use -= 1
+            if self._in_use == 0:
+                self._idle_handle = asyncio.get_running_loop().call_later(self._max_idle, self._close_idle)
+
+    def _close_idle(self) -> None:
+        self._idle_handle = None
+        if self._in_use == 0 and self._client is not None:
+            client, self._client = self._client, None
+            task = asyncio.create_task(client.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+            logger.info("API connection closed")
+
+async def test_api_connection(lkapi: api.LiveKitAPI, env_vars: dict) -> api.ListRoomsResponse:
     ws_url = env_vars["LIVEKIT_URL"]
     api_key = env_vars["LIVEKIT_API_KEY"]
-    api_secret = env_vars["LIVEKIT_API_SECRET"]
-    
-    http_url = ws_url.replace("wss://", "https://").replace("ws://", "http://")
     
-    print(f"Testing API Connection")
-    print(f"LiveKit URL: {ws_url}")
-    print(f"API Key: {api_key[:8]}..." if len(api_key) > 8 else f"   API Key: {api_key}")
-    
-    lkapi = api.LiveKitAPI(url=http_url, api_key=api_key, api_secret=api_secret)
+    logger.info("Testing API Connection")
+    logger.info("LiveKit URL: %s", ws_url)
+    logger.info("API Key: %s...", api_key[:8])
     
     try:
-        rooms = await lkapi.room.list_rooms(api.ListRoomsRequest())
-        print(f"API connection successful. Found {len(rooms.rooms)} active rooms.")
-        return lkapi
+        rooms = await lkapi.room.list_rooms(_LIST_ROOMS_REQUEST)
+        logger.info("API connection successful. Found %d active rooms.", len(rooms.rooms))
+        return rooms
     except Exception as e:
-        print(f"API connection failed: {e}")
-        await lkapi.aclose()
+        logger.error("API connection failed: %s", e)
         raise
 
-async def test_sip_configuration(env_vars: dict) -> None:
+async def test_sip_configuration(env_vars: dict, phone_numbers: Sequence[str] = (PHONE_NUMBER_TO_CALL,)) -> None:
     trunk_id = env_vars["SIP_OUTBOUND_TRUNK_ID"]
     
-    print(f"\nSIP Configuration")
-    print(f"Trunk ID: {trunk_id}")
-    print(f"Target Phone: {PHONE_NUMBER_TO_CALL}")
+    logger.info("SIP Configuration")
+    logger.info("Trunk ID: %s", trunk_id)
+    logger.info("Target Phone: %s", ", ".join(phone_numbers))
     
-    if not validate_phone_number(PHONE_NUMBER_TO_CALL):
-        raise ValueError(f"Invalid phone number format: {PHONE_NUMBER_TO_CALL}. Must be in E.164 format (e.g., +1234567890)")
+    invalid = [phone for phone in phone_numbers if not validate_phone_number(phone)]
+    if invalid:
+        raise ValueError(f"Invalid phone number format: {', '.join(invalid)}. Must be in E.164 format (e.g., +1234567890)")
     
-    print(f"Phone number format is valid (E.164)")
+    logger.info("Phone number format is valid (E.164)")
 
-async def create_payment_call(lkapi: api.LiveKitAPI, trunk_id: str) -> dict:
-    timestamp = int(time.time())
-    room_name = f"payment-outbound-call-{timestamp}"
+async def create_payment_call(lkapi: api.LiveKitAPI, trunk_id: str, phone_number: str = PHONE_NUMBER_TO_CALL) -> dict:
+    # Nanosecond room names keep dispatches made in the same second apart;
+    # metadata keeps whole seconds for readability.
+    timestamp_ns = time.time_ns()
+    timestamp = timestamp_ns // 1_000_000_000
+    room_name = f"payment-outbound-call-{timestamp_ns}"
     
-    print(f"\n🏦 Creating Credit Card Payment Call")
-    print(f"   Room Name: {room_name}")
-    print(f"   Agent: Emily - Payment Specialist")
-    print(f"   Company: SecureCard Financial Services")
-    print(f"   Phone: {PHONE_NUMBER_TO_CALL}")
+    logger.info("🏦 Creating Credit Card Payment Call")
+    logger.info("   Room Name: %s", room_name)
+    logger.info("   Agent: Emily - Payment Specialist")
+    logger.info("   Company: SecureCard Financial Services")
+    logger.info("   Phone: %s", phone_number)
     
-    metadata = json.dumps({
-        "phone_number": PHONE_NUMBER_TO_CALL,
+    meta_dict = {
+        "phone_number": phone_number,
         "call_type": "credit_card_payment",
         "company": "SecureCard Financial Services",
         "agent_name": "Emily",
         "created_at": timestamp,
         "purpose": "payment_collection"
-    })
-    print(f"📋 Call Metadata: {json.loads(metadata)}")
+    }
+    metadata = _json_dumps(meta_dict)
+    logger.debug("📋 Call Metadata: %s", meta_dict)
     
     try:
-        print(f"Dispatching payment agent...")
+        logger.info("Dispatching payment agent...")
         dispatch = await lkapi.agent_dispatch.create_dispatch(
             api.CreateAgentDispatchRequest(
                 agent_name=AGENT_NAME,
@@ -100,178 +274,362 @@ async def create_payment_call(lkapi: api.LiveKitAPI, trunk_id: str) -> dict:
                 metadata=metadata
             )
         )
+        try:
+            await asyncio.to_thread(record_room, dispatch.room, timestamp_ns)
+        except OSError as e:
+            logger.warning("⚠️  Could not record %s in the room ledger: %s", dispatch.room, e)
         call_info = {
             "dispatch_id": dispatch.id,
             "room": dispatch.room,
             "agent_name": AGENT_NAME,
-            "phone_number": PHONE_NUMBER_TO_CALL,
+            "phone_number": phone_number,
             "created_at": timestamp
         }
         
-        print(f"Payment call dispatch created successfully!")
-        print(f"Dispatch ID: {dispatch.id}")
-        print(f"Room: {dispatch.room}")
-        print(f"Status: Active")
+        logger.info("Payment call dispatch created successfully!")
+        logger.info("Dispatch ID: %s", dispatch.id)
+        logger.info("Room: %s", dispatch.room)
+        logger.info("Status: Active")
         
         return call_info
         
     except api.TwirpError as e:
-        print(f"\nLiveKit API Error:")
-        print(f"   Code: {e.code}")
-        print(f"   Message: {e.message}")
+        logger.error("LiveKit API Error:")
+        logger.error("   Code: %s", e.code)
+        logger.error("   Message: %s", e.message)
         
         if "object cannot be found" in e.message.lower():
-            print(f"\n🔧 Troubleshooting Tips:")
-            print(f"   1. Verify SIP trunk exists: {trunk_id}")
-            print(f"   2. Check trunk is configured for outbound calls")
-            print(f"   3. Confirm SIP provider credentials are correct")
-            print(f"   4. Ensure trunk has sufficient balance/credits")
+            logger.warning("🔧 Troubleshooting Tips:")
+            logger.warning("   1. Verify SIP trunk exists: %s", trunk_id)
+            logger.warning("   2. Check trunk is configured for outbound calls")
+            logger.warning("   3. Confirm SIP provider credentials are correct")
+            logger.warning("   4. Ensure trunk has sufficient balance/credits")
             
         elif "agent" in e.message.lower():
-            print(f"\n🔧 Agent Troubleshooting:")
-            print(f"   1. Verify agent name: {AGENT_NAME}")
-            print(f"   2. Check agent is deployed and running")
-            print(f"   3. Confirm agent has proper permissions")
+            logger.warning("🔧 Agent Troubleshooting:")
+            logger.warning("   1. Verify agent name: %s", AGENT_NAME)
+            logger.warning("   2. Check agent is deployed and running")
+            logger.warning("   3. Confirm agent has proper permissions")
             
         elif "unauthorized" in e.message.lower():
-            print(f"\n🔧 Authentication Issues:")
-            print(f"   1. Check API key and secret are correct")
-            print(f"   2. Verify API key has proper permissions")
-            print(f"   3. Ensure LiveKit URL is correct")
+            logger.warning("🔧 Authentication Issues:")
+            logger.warning("   1. Check API key and secret are correct")
+            logger.warning("   2. Verify API key has proper permissions")
+            logger.warning("   3. Ensure LiveKit URL is correct")
             
         raise
 
-async def monitor_call_status(lkapi: api.LiveKitAPI, room_name: str, duration: int = 60) -> None:
-    """Monitor the call status for a specified duration."""
-    print(f"\n👀 Monitoring call status for {duration} seconds...")
+async def dispatch_payment_calls(lkapi: api.LiveKitAPI, trunk_id: str, phone_numbers: Sequence[str], concurrency: int = 4) -> list:
+    """Dispatch one payment call per number, at most `concurrency` at a time.
+
+    Returns the call info dict, or the raised exception, for each number in order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def dispatch_one(phone_number: str) -> dict:
+        async with semaphore:
+            return await create_payment_call(lkapi, trunk_id, phone_number)
+
+    return await asyncio.gather(*(dispatch_one(phone) for phone in phone_numbers), return_exceptions=True)
+
+@asynccontextmanager
+async def webhook_events(env_vars: dict) -> AsyncIterator[asyncio.Queue | None]:
+    """Receive LiveKit webhooks on LIVEKIT_WEBHOOK_PORT and yield a queue of verified events.
+
+    Yields None when no port is configured or aiohttp is unavailable, in which
+    case monitoring falls back to polling.
+    """
+    port = os.getenv("LIVEKIT_WEBHOOK_PORT")
+    if not port or web is None:
+        yield None
+        return
+
+    receiver = api.WebhookReceiver(
+        api.TokenVerifier(env_vars["LIVEKIT_API_KEY"], env_vars["LIVEKIT_API_SECRET"])
+    )
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def handle(request: "web.Request") -> "web.Response":
+        body = await request.text()
+        try:
+            event = receiver.receive(body, request.headers.get("Authorization", ""))
+        except Exception as e:
+            logger.warning("   ⚠️  Rejected webhook: %s", e)
+            return web.Response(status=401)
+        events.put_nowait(event)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, port=int(port)).start()
+    logger.info("   📡 Listening for LiveKit webhooks on :%s%s", port, WEBHOOK_PATH)
+    try:
+        yield events
+    finally:
+        await runner.cleanup()
+
+async def _wait_for_room_event(events: asyncio.Queue, room_name: str, timeout: float) -> str | None:
+    """Return the next membership event for room_name, or None once timeout elapses."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while (remaining := deadline - loop.time()) > 0:
+        try:
+            event = await asyncio.wait_for(events.get(), timeout=remaining)
+        except asyncio.TimeoutError:
+            return None
+        if event.room.name == room_name and event.event in _ROOM_CHANGE_EVENTS:
+            return event.event
+    return None
+
+async def monitor_call_status(lkapi: api.LiveKitAPI, room_name: str, duration: int = 60, events: asyncio.Queue | None = None) -> None:
+    """Monitor the call status for a specified duration.
+
+    With a webhook event queue the participant list is only re-fetched when
+    LiveKit reports a membership change; otherwise it is polled adaptively.
+    """
+    logger.info("👀 Monitoring call status for %s seconds...", duration)
     
-    start_time = time.time()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
     last_participant_count = 0
+    # Poll every second while participants are coming and going, backing off
+    # towards MONITOR_MAX_INTERVAL while the room is steady.
+    interval = MONITOR_MIN_INTERVAL
+    request = api.ListParticipantsRequest(room=room_name)
+    room_closed = False
     
-    while time.time() - start_time < duration:
+    while not room_closed and loop.time() < deadline:
         try:
-            # Get room information
-            room_info = await lkapi.room.list_participants(
-                api.ListParticipantsRequest(room=room_name)
+            # Get room information; a stalled request must not outlive the window
+            room_info = await asyncio.wait_for(
+                lkapi.room.list_participants(request),
+                timeout=max(0.1, deadline - loop.time()),
             )
             
             participant_count = len(room_info.participants)
             
             # Only print updates when participant count changes
             if participant_count != last_participant_count:
-                print(f"   📊 Room: {room_name}")
-                print(f"   👥 Participants: {participant_count}")
+                logger.info("   📊 Room: %s", room_name)
+                logger.info("   👥 Participants: %d", participant_count)
                 
                 for participant in room_info.participants:
                     status = "🟢 Connected" if participant.state == 0 else "🔴 Disconnected"
-                    print(f"      - {participant.identity}: {status}")
+                    logger.info("      - %s: %s", participant.identity, status)
                 
                 last_participant_count = participant_count
+                interval = MONITOR_MIN_INTERVAL
+            else:
+                interval = min(interval * 1.5, MONITOR_MAX_INTERVAL)
             
-            await asyncio.sleep(5)  # Check every 5 seconds
-            
+        except asyncio.TimeoutError:
+            break
+
         except api.TwirpError as e:
             if "room not found" in e.message.lower():
-                print(f"   ℹ️  Call completed - room closed")
+                room_closed = True
                 break
             else:
-                print(f"   ⚠️  Monitoring error: {e.message}")
+                logger.warning("   ⚠️  Monitoring error: %s", e.message)
         
         except Exception as e:
-            print(f"   ⚠️  Unexpected monitoring error: {e}")
+            logger.warning("   ⚠️  Unexpected monitoring error: %s", e)
+
+        remaining = deadline - loop.time()
+        if events is None:
+            await asyncio.sleep(max(0.0, min(interval + random.uniform(0, 0.5), remaining)))
+        else:
+            # Re-check at least every MONITOR_MAX_INTERVAL in case a webhook is lost
+            event = await _wait_for_room_event(events, room_name, min(MONITOR_MAX_INTERVAL, remaining))
+            room_closed = event == "room_finished"
+
+    if room_closed:
+        logger.info("   Call completed - room closed")
 
-async def cleanup_old_rooms(lkapi: api.LiveKitAPI, max_age_minutes: int = 30) -> None:
-    """Clean up old payment call rooms."""
+async def cleanup_old_rooms(lkapi: api.LiveKitAPI, rooms: api.ListRoomsResponse | None = None, max_age_minutes: int = 30, concurrency: int = 8) -> None:
+    """Clean up old payment call rooms.
+
+    Stale rooms come from the local room ledger when there is one; otherwise
+    from list_rooms, reusing a fresh response when given.
+    """
     try:
-        rooms = await lkapi.room.list_rooms(api.ListRoomsRequest())
-        current_time = time.time()
+        current_ns = time.time_ns()
+        max_age_ns = max_age_minutes * 60 * 1_000_000_000
+        ledger = await asyncio.to_thread(_read_room_ledger)
         
-        old_rooms = []
-        for room in rooms.rooms:
-            if room.name.startswith("payment-outbound-call-"):
+        if ledger is not None:
+            old_rooms = [name for name, created_ns in ledger.items() if current_ns - created_ns > max_age_ns]
+        else:
+            if rooms is None:
+                rooms = await lkapi.room.list_rooms(_LIST_ROOMS_REQUEST)
+            old_rooms = []
+            for room in rooms.rooms:
                 # Extract timestamp from room name
-                try:
-                    timestamp_str = room.name.split("-")[-1]
-                    room_timestamp = int(timestamp_str)
-                    age_minutes = (current_time - room_timestamp) / 60
-                    
-                    if age_minutes > max_age_minutes:
-                        old_rooms.append(room.name)
-                except (ValueError, IndexError):
+                match = _ROOM_TS_RE.match(room.name)
+                if match is None:
                     continue
+                created_ns = int(match.group(1))
+                if created_ns < _LEGACY_ROOM_TS_LIMIT:
+                    # Rooms created before the switch to nanoseconds carry seconds
+                    created_ns *= 1_000_000_000
+                if current_ns - created_ns > max_age_ns:
+                    old_rooms.append(room.name)
         
         if old_rooms:
-            print(f"\n🧹 Cleaning up {len(old_rooms)} old rooms...")
-            for room_name in old_rooms:
-                try:
+            logger.info("🧹 Cleaning up %d old rooms...", len(old_rooms))
+            # Bounded so a large backlog does not crowd the dispatch running
+            # alongside it off the shared client
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def delete_one(room_name: str) -> None:
+                async with semaphore:
                     await lkapi.room.delete_room(api.DeleteRoomRequest(room=room_name))
-                    print(f"   ✅ Deleted: {room_name}")
-                except Exception as e:
-                    print(f"   ❌ Failed to delete {room_name}: {e}")
+
+            results = await asyncio.gather(*(delete_one(room_name) for room_name in old_rooms), return_exceptions=True)
+            gone = []
+            for room_name, result in zip(old_rooms, results, strict=True):
+                if isinstance(result, api.TwirpError) and result.code == "not_found":
+                    # Already closed on the server; nothing left to delete
+                    gone.append(room_name)
+                elif isinstance(result, Exception):
+                    logger.warning("   ❌ Failed to delete %s: %s", room_name, result)
+                else:
+                    gone.append(room_name)
+                    logger.info("   ✅ Deleted: %s", room_name)
+            if ledger is not None and gone:
+                # Failed deletions stay in the ledger for the next run
+                await asyncio.to_thread(forget_rooms, gone)
         else:
-            print(f"\n✨ No old rooms to clean up")
+            logger.info("✨ No old rooms to clean up")
             
     except Exception as e:
-        print(f"⚠️  Cleanup error: {e}")
+        logger.warning("⚠️  Cleanup error: %s", e)
 
-async def main():
-    """Main function to orchestrate the payment call."""
-    print("🎯 SecureCard Financial Services - Payment Collection Call")
-    print("=" * 60)
+def parse_phone_list(spec: str) -> list[str]:
+    """Parse a comma-separated list of numbers, or @path to a file with one number per line."""
+    if spec.startswith("@"):
+        try:
+            with open(spec[1:], encoding="utf-8") as f:
+                entries = [line.split("#", 1)[0] for line in f]
+        except (OSError, UnicodeDecodeError) as e:
+            raise argparse.ArgumentTypeError(f"cannot read phone list: {e}") from e
+    else:
+        entries = spec.split(",")
+    # Strip, drop blanks and repeat numbers, keep the given order
+    return list(dict.fromkeys(entry.strip() for entry in entries if entry.strip()))
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Dispatch Emily to place a payment collection call.")
+    parser.add_argument("--phone", default=PHONE_NUMBER_TO_CALL, help="E.164 number to call")
+    parser.add_argument("--phones", type=parse_phone_list, help="numbers to call: comma-separated, or @file with one per line (overrides --phone)")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum dispatches in flight at once")
+    parser.add_argument("--cleanup-concurrency", type=int, default=os.getenv("CLEANUP_CONCURRENCY", "8"), help="maximum room deletions in flight at once (default: $CLEANUP_CONCURRENCY or 8)")
+    parser.add_argument("--monitor", action=argparse.BooleanOptionalAction, default=False, help="monitor the call after dispatch")
+    parser.add_argument("--monitor-duration", type=int, default=120, help="seconds to monitor the call for")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.cleanup_concurrency < 1:
+        parser.error("--cleanup-concurrency must be at least 1")
+    if args.phones is not None and not args.phones:
+        parser.error("--phones did not contain any numbers")
+    return args
+
+def configure_logging() -> None:
+    """Log to stderr at LOG_LEVEL, falling back to INFO for an unknown level name."""
+    level_name = os.getenv("LOG_LEVEL", "INFO").upper()
+    level = logging.getLevelName(level_name)
+    known = isinstance(level, int)
+    logging.basicConfig(level=level if known else logging.INFO, format="%(message)s")
+    if not known:
+        logger.warning("⚠️  Unknown LOG_LEVEL %r, logging at INFO", level_name)
+
+async def main(args: argparse.Namespace) -> int:
+    """Main function to orchestrate the payment calls. Returns the process exit status."""
+    configure_logging()
+    logger.info("🎯 SecureCard Financial Services - Payment Collection Call")
+    logger.info("=" * 60)
+    phone_numbers = args.phones if args.phones is not None else [args.phone]
     
     try:
         # Step 1: Validate environment
-        print("1️⃣ Validating environment configuration...")
-        env_vars = validate_environment()
-        print("✅ Environment validation successful")
+        logger.info("1️⃣ Validating environment configuration...")
+        env_vars = dict(validate_environment())
+        logger.info("✅ Environment validation successful")
         
-        # Step 2: Test API connection
-        print("\n2️⃣ Testing LiveKit API connection...")
-        lkapi = test_api_connection(env_vars)
+        async with AsyncLiveKitPool(env_vars) as pool, pool.acquire() as lkapi:
+            # Step 2: Test API connection
+            logger.info("2️⃣ Testing LiveKit API connection...")
+            rooms = await test_api_connection(lkapi, env_vars)
         
-        # Step 3: Test SIP configuration
-        print("3️⃣ Validating SIP configuration...")
-        await test_sip_configuration(env_vars)
+            # Step 3: Test SIP configuration
+            logger.info("3️⃣ Validating SIP configuration...")
+            await test_sip_configuration(env_vars, phone_numbers)
         
-        # Step 4: Clean up old rooms
-        print("\n4️⃣ Cleaning up old rooms...")
-        await cleanup_old_rooms(lkapi)
+            # Step 4: Clean up old rooms, alongside the dispatch; they touch disjoint rooms
+            logger.info("4️⃣ Cleaning up old rooms...")
+            cleanup_task = asyncio.create_task(cleanup_old_rooms(lkapi, rooms, concurrency=args.cleanup_concurrency))
         
-        # Step 5: Create the payment call
-        print("\n5️⃣ Creating payment collection call...")
-        call_info = await create_payment_call(lkapi, env_vars["SIP_OUTBOUND_TRUNK_ID"])
+            # Step 5: Create the payment calls
+            logger.info("5️⃣ Creating payment collection call...")
+            try:
+                results = await dispatch_payment_calls(
+                    lkapi, env_vars["SIP_OUTBOUND_TRUNK_ID"], phone_numbers, args.concurrency
+                )
+            finally:
+                # Cleanup reports its own failures; it only has to finish before the client closes
+                await asyncio.gather(cleanup_task, return_exceptions=True)
+
+            calls = [result for result in results if not isinstance(result, BaseException)]
+            if not calls:
+                raise results[0]
+            failed = 0
+            for phone, result in zip(phone_numbers, results, strict=True):
+                if isinstance(result, BaseException):
+                    failed += 1
+                    logger.error("   ❌ Dispatch to %s failed: %s", phone, result)
         
-        # Step 6: Monitor the call
-        print("\n6️⃣ Call initiated successfully!")
-        print(f"   📞 Emily is now calling: {PHONE_NUMBER_TO_CALL}")
-        print(f"   💳 Purpose: Credit card payment collection")
-        print(f"   🏢 Company: SecureCard Financial Services")
+            # Step 6: Monitor the calls
+            logger.info("6️⃣ Call initiated successfully!")
+            for call_info in calls:
+                logger.info("   📞 Emily is now calling: %s", call_info["phone_number"])
+            logger.info("   💳 Purpose: Credit card payment collection")
+            logger.info("   🏢 Company: SecureCard Financial Services")
         
-        # Optional: Monitor call status
-        monitor_choice = input("\n❓ Would you like to monitor the call status? (y/N): ").lower()
-        if monitor_choice in ['y', 'yes']:
-            await monitor_call_status(lkapi, call_info["room"], duration=120)
+            # Optional: Monitor call status
+            if args.monitor:
+                async with webhook_events(env_vars) as events:
+                    # A single event queue can only follow one room; several calls are polled
+                    room_events = events if len(calls) == 1 else None
+                    await asyncio.gather(*(
+                        monitor_call_status(lkapi, call_info["room"], duration=args.monitor_duration, events=room_events)
+                        for call_info in calls
+                    ))
         
-        print(f"\n🎉 Call dispatch completed successfully!")
-        print(f"   Dispatch ID: {call_info['dispatch_id']}")
-        print(f"   Room: {call_info['room']}")
+            if failed:
+                logger.error("❌ Call dispatch finished with %d of %d dispatches failed", failed, len(results))
+            else:
+                logger.info("🎉 Call dispatch completed successfully!")
+            for call_info in calls:
+                logger.info("   Dispatch ID: %s", call_info["dispatch_id"])
+                logger.info("   Room: %s", call_info["room"])
+            return 1 if failed else 0
         
     except ValueError as e:
-        print(f"Configuration Error: {e}")
-        print("\nMake sure your .env.local file contains all required variables:")
+        logger.error("Configuration Error: %s", e)
+        logger.error("Make sure your .env.local file contains all required variables:")
         for var in REQUIRED_ENV_VARS:
-            print(f"   {var}=your_value_here")
+            logger.error("   %s=your_value_here", var)
             
     except api.TwirpError as e:
-        print(f"LiveKit API Error: {e.message}")
+        logger.error("LiveKit API Error: %s", e.message)
         
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        
-    finally:
-        if 'lkapi' in locals():
-            await lkapi.aclose()
-            print(f"\nAPI connection closed")
+        logger.error("Unexpected error: %s", e)
+
+    return 1
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main(parse_args())))
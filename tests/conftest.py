@@ -0,0 +1,10 @@
+import os
+
+# agent.py and call.py validate these at import time; tests never reach LiveKit.
+for _name, _value in (
+    ("LIVEKIT_API_KEY", "test-key"),
+    ("LIVEKIT_API_SECRET", "test-secret"),
+    ("LIVEKIT_URL", "wss://example.livekit.cloud"),
+    ("SIP_OUTBOUND_TRUNK_ID", "ST_test"),
+):
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,97 @@
+import argparse
+import json
+
+import pytest
+
+import call
+from call import http_url, parse_args, parse_phone_list
+
+
+@pytest.fixture
+def ledger_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "rooms.json")
+    monkeypatch.setattr(call, "ROOM_LEDGER_PATH", path)
+    return path
+
+
+def test_parse_phone_list_from_string():
+    assert parse_phone_list(" +15550100, ,+15550101,+15550100 ") == ["+15550100", "+15550101"]
+
+
+def test_parse_phone_list_from_file(tmp_path):
+    phones = tmp_path / "phones.txt"
+    phones.write_text("# campaign\n+15550100\n\n+15550101  # callback\n+15550100\n", encoding="utf-8")
+
+    assert parse_phone_list(f"@{phones}") == ["+15550100", "+15550101"]
+
+
+def test_parse_phone_list_missing_file(tmp_path):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_phone_list(f"@{tmp_path / 'missing.txt'}")
+
+
+def test_parse_args_defaults_to_single_phone():
+    args = parse_args([])
+    assert args.phones is None
+    assert args.phone == call.PHONE_NUMBER_TO_CALL
+
+
+def test_cleanup_concurrency_from_environment(monkeypatch):
+    monkeypatch.setenv("CLEANUP_CONCURRENCY", "3")
+    assert parse_args([]).cleanup_concurrency == 3
+
+    monkeypatch.setenv("CLEANUP_CONCURRENCY", "many")
+    with pytest.raises(SystemExit) as excinfo:
+        parse_args([])
+    assert excinfo.value.code == 2
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--phones", ""],
+        ["--phones", "@/nonexistent/phones.txt"],
+        ["--concurrency", "0"],
+        ["--cleanup-concurrency", "0"],
+    ],
+)
+def test_parse_args_rejects(argv):
+    with pytest.raises(SystemExit) as excinfo:
+        parse_args(argv)
+    assert excinfo.value.code == 2
+
+
+@pytest.mark.parametrize(
+    ("ws_url", "expected"),
+    [
+        ("wss://example.livekit.cloud", "https://example.livekit.cloud"),
+        ("ws://localhost:7880/path?q=1", "http://localhost:7880/path?q=1"),
+        ("WSS://example.livekit.cloud", "https://example.livekit.cloud"),
+        ("https://example.livekit.cloud", "https://example.livekit.cloud"),
+    ],
+)
+def test_http_url(ws_url, expected):
+    assert http_url(ws_url) == expected
+
+
+def test_room_ledger_record_and_forget(ledger_path):
+    call.record_room("payment-outbound-call-1", 1)
+    call.record_room("payment-outbound-call-2", 2)
+    call.forget_rooms(["payment-outbound-call-1", "payment-outbound-call-unknown"])
+
+    with open(ledger_path, encoding="utf-8") as f:
+        assert json.load(f) == {"payment-outbound-call-2": 2}
+
+
+def test_forget_rooms_without_ledger(ledger_path):
+    call.forget_rooms(["payment-outbound-call-1"])
+    assert call._read_room_ledger() is None
+
+
+def test_unreadable_ledger_is_ignored(ledger_path):
+    with open(ledger_path, "w", encoding="utf-8") as f:
+        f.write("not json")
+
+    assert call._read_room_ledger() is None
+    call.record_room("payment-outbound-call-1", 1)
+    assert call._read_room_ledger() == {"payment-outbound-call-1": 1}
@@ -0,0 +1,121 @@
+import dataclasses
+import json
+import sqlite3
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import agent
+from agent import CallState, _load_call_state, _save_call_state
+
+PHONE = "+15550100"
+
+
+@pytest.fixture(autouse=True)
+def call_state_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "calls.sqlite3")
+    monkeypatch.setattr(agent, "CONFIG", dataclasses.replace(agent.CONFIG, call_state_db=path))
+    return path
+
+
+def _write_row(path, state, updated_at=None):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS call_state ("
+            "phone TEXT PRIMARY KEY, state_json TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO call_state VALUES (?, ?, ?)",
+            (PHONE, json.dumps(state), time.time() if updated_at is None else updated_at),
+        )
+    conn.close()
+
+
+def test_round_trip_restores_typed_fields():
+    _save_call_state(CallState(
+        phone_number=PHONE,
+        customer_name="Alex",
+        payment_amount=Decimal("150.00"),
+        due_date=date(2026, 11, 15),
+        objections=("too busy",),
+        last_four_digits=1234,
+        billing_zip="94107",
+    ))
+
+    state = _load_call_state(PHONE)
+    assert state.customer_name == "Alex"
+    assert state.payment_amount == Decimal("150.00")
+    assert state.due_date == date(2026, 11, 15)
+    assert state.objections == ("too busy",)
+    # Card verification details are never persisted
+    assert state.last_four_digits is None
+    assert state.billing_zip is None
+
+
+def test_unknown_number_gets_fresh_state():
+    state = _load_call_state(PHONE)
+    assert state == CallState(phone_number=PHONE, call_start_time=state.call_start_time)
+
+
+def test_confirmed_payment_is_history_only():
+    _save_call_state(CallState(
+        phone_number=PHONE,
+        customer_name="Alex",
+        payment_amount=Decimal("80.00"),
+        due_date=date(2026, 11, 15),
+        objections=("too busy",),
+        payment_confirmed=True,
+        confirmation_number="SC202610140001",
+    ))
+
+    state = _load_call_state(PHONE)
+    assert state.customer_name == "Alex"
+    assert state.last_confirmation_number == "SC202610140001"
+    assert not state.payment_confirmed
+    assert state.confirmation_number is None
+    assert state.payment_amount is None
+    assert state.due_date is None
+    assert state.objections == ()
+
+
+def test_objections_are_capped():
+    _save_call_state(CallState(phone_number=PHONE, objections=tuple(f"too busy {i}" for i in range(8))))
+
+    objections = _load_call_state(PHONE).objections
+    assert len(objections) == agent._MAX_OBJECTIONS
+    assert objections[-1] == "too busy 7"
+
+
+def test_expired_rows_are_deleted(call_state_db):
+    _write_row(call_state_db, {"customer_name": "Alex"}, updated_at=time.time() - agent.CONFIG.call_state_ttl_s - 60)
+
+    assert _load_call_state(PHONE).customer_name is None
+    with sqlite3.connect(call_state_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM call_state").fetchone()[0] == 0
+    conn.close()
+
+
+def test_legacy_row_drops_per_call_outcome(call_state_db):
+    # Rows written before the outcome fields were dropped from the saved state
+    _write_row(call_state_db, {
+        "customer_name": "Alex",
+        "payment_amount": "150.00",
+        "due_date": "2026-11-15",
+        "objections": ["too busy"],
+        "payment_confirmed": True,
+        "confirmation_number": "SC202610140001",
+    })
+
+    state = _load_call_state(PHONE)
+    assert state.customer_name == "Alex"
+    assert state.payment_amount == Decimal("150.00")
+    assert not state.payment_confirmed
+    assert state.confirmation_number is None
+
+
+def test_spoken_due_date_round_trips():
+    _save_call_state(CallState(phone_number=PHONE, due_date="next Friday"))
+
+    assert _load_call_state(PHONE).due_date == "next Friday"
@@ -0,0 +1,61 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from agent import parse_due_date, parse_payment_amount, validate_phone_number
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("150", Decimal("150.00")),
+        ("75.50", Decimal("75.50")),
+        ("$1,234.50", Decimal("1234.50")),
+        ("0.01", Decimal("0.01")),
+        ("50000", Decimal("50000.00")),
+        ("150.990", Decimal("150.99")),
+    ],
+)
+def test_parse_payment_amount_accepts(text, expected):
+    assert parse_payment_amount(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "0",
+        "-5",
+        "0.004",
+        "150.999",
+        "10.005",
+        "50000.01",
+        "1e40",
+        "NaN",
+        "Infinity",
+        "-Infinity",
+        "fifty dollars",
+        "",
+    ],
+)
+def test_parse_payment_amount_rejects(text):
+    assert parse_payment_amount(text) is None
+
+
+def test_parse_due_date_keeps_spoken_dates():
+    assert parse_due_date("2026-11-15") == date(2026, 11, 15)
+    assert parse_due_date(" the 15th ") == "the 15th"
+    assert parse_due_date("") is None
+
+
+@pytest.mark.parametrize("phone", ["+15551234567", "+919787264648", "+44"])
+def test_validate_phone_number_accepts(phone):
+    assert validate_phone_number(phone)
+
+
+@pytest.mark.parametrize(
+    "phone",
+    ["", "+", "+1", "15551234567", "+05551234567", "+1555123456789012", "+1555-123-4567", "+١٥٥٥١٢٣٤٥٦٧"],
+)
+def test_validate_phone_number_rejects(phone):
+    assert not validate_phone_number(phone)